@@ -1,22 +1,47 @@
 import os
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Tuple
 
+# Environment snapshot taken once at import; validate() and the frozen
+# Config below read from these instead of hitting os.environ per access.
+_AZURE_OPENAI_API_KEY: Optional[str] = os.getenv("AZURE_OPENAI_API_KEY")
+_AZURE_ENDPOINT: str = os.getenv(
+    "AZURE_ENDPOINT", "https://achat.advai.net/api/v1/openai/proxy"
+)
+_AZURE_DEPLOYMENT_NAME: str = os.getenv(
+    "AZURE_DEPLOYMENT_NAME", "gpt4o-mini")
+_MAX_WORKERS: int = int(os.getenv("JDK_UPGRADER_CONCURRENCY", "16"))
+_BATCH_SIZE: int = int(os.getenv("JDK_UPGRADER_BATCH_SIZE", "4"))
+_CACHE_DIR: str = os.path.expanduser(
+    os.getenv("JDK_UPGRADER_CACHE_DIR", "~/.cache/jdk-upgrader"))
+_NO_CACHE: bool = os.getenv("JDK_UPGRADER_NOCACHE") == "1"
 
+
+@dataclass(frozen=True, slots=True)
 class Config:
     # Azure OpenAI settings
-    AZURE_OPENAI_API_KEY: Optional[str] = os.getenv("AZURE_OPENAI_API_KEY")
-    AZURE_ENDPOINT: str = os.getenv(
-        "AZURE_ENDPOINT", "https://achat.advai.net/api/v1/openai/proxy"
-    )
+    AZURE_OPENAI_API_KEY: Optional[str] = _AZURE_OPENAI_API_KEY
+    AZURE_ENDPOINT: str = _AZURE_ENDPOINT
     AZURE_API_VERSION: str = "2025-04-01-preview"
-    AZURE_DEPLOYMENT_NAME: str = os.getenv(
-        "AZURE_DEPLOYMENT_NAME", "gpt4o-mini")
+    AZURE_DEPLOYMENT_NAME: str = _AZURE_DEPLOYMENT_NAME
 
     TEMPERATURE: float = 0.1
 
+    # Concurrent LLM analysis calls; the work is network-bound so this
+    # should track the Azure deployment's rate limit, not the core count.
+    MAX_WORKERS: int = _MAX_WORKERS
+
+    # Max build files folded into one LLM request; amortizes the static
+    # prompt sections (instructions + format spec) over the batch.
+    BATCH_SIZE: int = _BATCH_SIZE
+
+    # On-disk LLM response cache; JDK_UPGRADER_NOCACHE=1 forces a refresh.
+    CACHE_DIR: str = _CACHE_DIR
+    NO_CACHE: bool = _NO_CACHE
+
     # NOTE:
     # It is a deliberate decision NOT to update user-defined Gradle scripts
-    BUILD_FILES = [
+    BUILD_FILES: Tuple[str, ...] = (
         # Gradle
         "**/build.gradle",
         "**/build.gradle.kts",
@@ -26,15 +51,50 @@ class Config:
 
         # Maven
         "**/pom.xml",
-        "**/maven-wrapper.properties"
-    ]
-    CI_FILES = ["Dockerfile", ".gitlab-ci.yml", ".gitlab-ci.yaml"]
-    SOURCE_FILES = ["**/*.java", "**/*.groovy", "**/*.kt"]
+        "**/maven-wrapper.properties",
+    )
+    CI_FILES: Tuple[str, ...] = (
+        "Dockerfile", ".gitlab-ci.yml", ".gitlab-ci.yaml")
+    SOURCE_FILES: Tuple[str, ...] = ("**/*.java", "**/*.groovy", "**/*.kt")
 
-    TARGET_JDK_VERSION = "21"
+    TARGET_JDK_VERSION: str = "21"
 
-    @classmethod
-    def validate(cls):
-        if not cls.AZURE_OPENAI_API_KEY:
+    @staticmethod
+    def validate():
+        if not _AZURE_OPENAI_API_KEY:
             raise ValueError(
                 "AZURE_OPENAI_API_KEY environment variable required")
+
+
+# Single frozen instance; attribute access goes through C-level slots
+# instead of a class __dict__ lookup on every CONFIG.X in the hot loops.
+CONFIG = Config()
+
+
+def _pattern_basenames(patterns: Tuple[str, ...]) -> frozenset:
+    """Strip the leading **/ from glob patterns, keeping the basenames.
+
+    Every build/CI pattern is a literal basename, so the repository scan
+    can probe a frozenset instead of running regex or fnmatch machinery.
+    """
+    return frozenset(p.rpartition("/")[2] for p in patterns)
+
+
+# Precomputed at import so the repository scan walks the tree once and
+# probes each filename with a hashed set lookup instead of running one
+# glob (= one full tree walk) per pattern.
+BUILD_FILE_NAMES = _pattern_basenames(CONFIG.BUILD_FILES)
+CI_FILE_NAMES = _pattern_basenames(CONFIG.CI_FILES)
+
+# Source files are routed purely by extension, so a hashed suffix probe
+# beats running glob machinery over the tree per pattern.
+SOURCE_SUFFIXES = frozenset(
+    "." + p.rpartition(".")[2] for p in CONFIG.SOURCE_FILES)
+
+# Directories never worth descending into when scanning a repository.
+# .mvn is deliberately absent: it holds wrapper/maven-wrapper.properties,
+# which BUILD_FILES targets.
+SKIP_DIRS = frozenset({
+    ".git", ".gradle", ".idea",
+    "build", "target", "out", "node_modules",
+})
@@ -1,21 +1,29 @@
 #!/usr/bin/env python3
+import atexit
+import logging
+
 import click
 from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.prompt import Confirm
-from rich.progress import Progress
-from rich.markdown import Markdown
-from langchain_openai import AzureChatOpenAI
-from langchain.schema import HumanMessage
-
-from config import Config
-from src.upgraders.upgrade_pipeline import UpgradePipeline
+from rich.logging import RichHandler
+
+from config import CONFIG
 from src.writers.change_writer import ChangeWriter
 
+# NOTE: langchain imports (and the modules that pull them in) are
+# deferred into main() — they cost hundreds of ms, and --help or a
+# failed validation should not pay for them.
+
 console = Console()
 
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(message)s",
+    datefmt="[%X]",
+    handlers=[RichHandler(console=console, show_path=False)],
+)
+
 
 @click.command()
 @click.argument("repo_path", type=click.Path(exists=True, path_type=Path))
@@ -30,25 +38,60 @@ def main(repo_path: Path, dry_run: bool, auto_approve: bool):
         2, 5), style="bold blue"))
 
     try:
-        Config.validate()
+        CONFIG.validate()
+
+        import httpx
+        from langchain_openai import AzureChatOpenAI
+
+        # Exact-match LLM cache: byte-identical prompts (retries, re-runs
+        # on an unchanged repo) short-circuit inside langchain before
+        # touching the network. Optional — langchain-community is not a
+        # hard dependency.
+        try:
+            from langchain_community.cache import SQLiteCache
+            from langchain_core.globals import set_llm_cache
+
+            cache_dir = Path(CONFIG.CACHE_DIR)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            set_llm_cache(SQLiteCache(
+                database_path=str(cache_dir / "llm_cache.db")))
+        except ImportError:
+            pass
+
+        # One shared connection pool for every upgrader and the
+        # OutputFixingParser retries; keep-alive connections are reused
+        # across the concurrent analysis calls instead of paying a TLS
+        # handshake per request. With HTTP/2 the concurrent calls
+        # multiplex as streams over a few connections instead of
+        # queueing behind per-connection limits.
+        http_client = httpx.Client(http2=True, limits=httpx.Limits(
+            max_connections=CONFIG.MAX_WORKERS,
+            max_keepalive_connections=CONFIG.MAX_WORKERS,
+        ))
+        atexit.register(http_client.close)
+
         llm = AzureChatOpenAI(
-            azure_endpoint=Config.AZURE_ENDPOINT,
-            api_version=Config.AZURE_API_VERSION,
-            api_key=Config.AZURE_OPENAI_API_KEY,
-            azure_deployment=Config.AZURE_DEPLOYMENT_NAME,
-            temperature=Config.TEMPERATURE,
+            azure_endpoint=CONFIG.AZURE_ENDPOINT,
+            api_version=CONFIG.AZURE_API_VERSION,
+            api_key=CONFIG.AZURE_OPENAI_API_KEY,
+            azure_deployment=CONFIG.AZURE_DEPLOYMENT_NAME,
+            temperature=CONFIG.TEMPERATURE,
+            http_client=http_client,
         )
     except ValueError as e:
         console.print(f"❌ {e}", style="bold red")
         raise click.Abort()
 
     # TEST: LLM liveness / setup check
+    # from langchain.schema import HumanMessage
     # response = llm.invoke([
     #     HumanMessage(content="Hello, World! say something nice")
     # ])
     #
     # console.print(f"Response: {response.content}", style="bold green")
 
+    from src.upgraders.upgrade_pipeline import UpgradePipeline
+
     pipeline = UpgradePipeline(llm, console)
     responses = pipeline.analyze_repository(repo_path)
 
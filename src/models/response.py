@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import List, Literal
 from pydantic import BaseModel, Field
 
@@ -28,8 +29,15 @@ class Change(BaseModel):
     change_type: Literal["insert", "update", "delete"] = Field(
         description="insert|update|delete")
 
-    def __str__(self) -> str:
+    @cached_property
+    def rendered_diff(self) -> str:
+        """Colorized diff body, rendered once per change.
 
+        before/after never mutate after parsing, so the per-line markup
+        build is cached; dry-run and interactive review both print the
+        same change and share one rendering. The location header is NOT
+        cached — file paths are rewritten after parsing.
+        """
         def format_lines(text: str, prefix: str, color: str) -> str:
             if not text.strip():
                 return ""
@@ -39,10 +47,11 @@ class Change(BaseModel):
         before_diff = format_lines(self.before, "-", "red")
         after_diff = format_lines(self.after, "+", "green")
 
-        diff_content = '\n'.join(
+        return '\n'.join(
             [d for d in [before_diff, after_diff] if d.strip()])
 
-        return f"[{self.location}] {self.reason}\n\n{diff_content}"
+    def __str__(self) -> str:
+        return f"[{self.location}] {self.reason}\n\n{self.rendered_diff}"
 
 
 class StructuredResponse(BaseModel):
@@ -1,11 +1,38 @@
+import functools
+import hashlib
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
 from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
-from langchain.prompts import PromptTemplate
+from langchain.schema import HumanMessage, SystemMessage
 from rich.console import Console
 
-from config import Config
+from config import CONFIG
 from src.models.response import StructuredResponse
 from src.upgraders.prompts import get_logic_preservation_prompt, CHANGE_PROMPT, EXTRA_PROMPT
 
+log = logging.getLogger("jdk_upgrader.upgraders")
+
+
+# Compiled once; handles leading/trailing whitespace around the fence,
+# which the removeprefix/removesuffix approach missed.
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+def _strip_fences(text: str) -> str:
+    """Strip a Markdown code fence wrapping the model's JSON, if any."""
+    match = _FENCE_RE.match(text)
+    return match.group(1) if match else text.strip()
+
+
+@functools.cache
+def _get_base_parser() -> PydanticOutputParser:
+    """Shared stateless parser; built once per process."""
+    return PydanticOutputParser(pydantic_object=StructuredResponse)
+
 
 class BaseUpgrader:
     """Base class for all JDK upgraders."""
@@ -16,46 +43,275 @@ class BaseUpgrader:
 
     def __init__(self, llm, console=None):
         """Initialize with LangChain LLM instance."""
-        base_parser = PydanticOutputParser(pydantic_object=StructuredResponse)
-        self.parser = OutputFixingParser.from_llm(parser=base_parser, llm=llm)
-        self.prompt = PromptTemplate(
-            template=self.PROMPT,
-            input_variables=["file_content", "target_jdk"],
-            partial_variables=self._get_partial_variables()
-        )
+        # The fixing parser is built on first use, not here: it binds an
+        # extra LLM client, and most runs never see malformed JSON.
+        self._fixing_parser = None
+        # All static prompt text rides in the system message so the
+        # provider's prefix (KV) cache applies across calls; only the
+        # file content varies, in the user message.
+        self.system_message = SystemMessage(content=(
+            "(The file content to analyze is provided in the user message.)"
+            .join(self._get_prompt_segments())))
         self.console = console or Console()
-        self.chain = self.prompt | llm | self.parser
+        # In-run duplicate coalescing: monorepos carry many files that
+        # are identical after whitespace normalization (copied
+        # Dockerfiles, per-module build scripts). The first caller per
+        # content key does the LLM call; concurrent callers for the same
+        # key wait on its event, later ones hit the memo directly.
+        self._inflight_lock = threading.Lock()
+        self._inflight = {}
+        self._analyzed = {}
+        # Native structured outputs: the response schema rides in the
+        # request as a json_schema response format instead of ~1k tokens
+        # of format-instruction prose per call, and responses come back
+        # schema-validated.
+        self.structured_llm = llm.with_structured_output(
+            StructuredResponse, method="json_schema", strict=True)
+        # The raw llm survives for the fallback text path (_invoke) and
+        # the fixing parser's repair calls.
+        self.llm = llm
+
+    @classmethod
+    def _get_prompt_segments(cls) -> List[str]:
+        """Render the class's static prompt once and pre-split it.
+
+        All static sections are substituted up front; the segments are
+        the rendered prompt split around the file_content slot, so each
+        call is a single join instead of a format() scan over the full
+        multi-KB template.
+        """
+        segments = cls.__dict__.get("_prompt_segments")
+        if segments is None:
+            # NUL survives none of the prompt texts, making it a safe
+            # placeholder to split on after rendering.
+            rendered = cls.PROMPT.format(
+                file_content="\x00", **cls._get_partial_variables())
+            segments = rendered.split("\x00")
+            cls._prompt_segments = segments
+            # Folded into the cache key below so any prompt edit
+            # invalidates previously cached responses.
+            cls._prompt_fingerprint = hashlib.sha256(
+                rendered.encode()).hexdigest()[:16]
+        return segments
 
-    def _get_partial_variables(self):
+    def _build_messages(self, file_content: str) -> List:
+        """Pair the shared system message with the per-call user content."""
+        return [self.system_message, HumanMessage(content=file_content)]
+
+    @classmethod
+    def _get_partial_variables(cls):
         """Get partial variables for prompt template."""
 
         # Get language from class name (JavaUpgrader -> java)
-        language = self.__class__.__name__.replace("Upgrader", "").lower()
+        language = cls.__name__.replace("Upgrader", "").lower()
 
         return {
-            "analysis_instructions": self.ANALYSIS_INSTRUCTIONS,
+            # Pre-rendered once per class: a {target_jdk} left inside a
+            # partial variable would survive the single-pass template format.
+            "analysis_instructions": cls.ANALYSIS_INSTRUCTIONS.format(
+                target_jdk=CONFIG.TARGET_JDK_VERSION),
             "change_prompt": CHANGE_PROMPT,
             "extra_prompt": EXTRA_PROMPT,
-            "format_instructions": self.parser.get_format_instructions(),
+            # The schema travels via with_structured_output; the prompt
+            # slot keeps only a one-line pointer.
+            "format_instructions":
+                "Respond in the structured output format you were given.",
             "logic_preservation_prompt": get_logic_preservation_prompt(language),
+            # Static per-process; binding it here keeps the per-call
+            # invoke payload down to file_content alone.
+            "target_jdk": CONFIG.TARGET_JDK_VERSION,
         }
 
-    def analyze(self, file_content: str, file_path: str) -> StructuredResponse:
-        """Analyze code for JDK upgrade opportunities."""
+    def _invoke(self, content: str) -> StructuredResponse:
+        """One LLM call yielding a validated StructuredResponse.
+
+        The structured-output call is the hot path; if the provider
+        rejects it or returns nothing, retry as a plain text call and
+        recover through the parse machinery.
+        """
+        messages = self._build_messages(content)
+        try:
+            result = self.structured_llm.invoke(messages)
+            if result is not None:
+                return result
+        except Exception:
+            pass
+        log.warning("Structured output failed; retrying via text parse")
+        return self._parse_response(self.llm.invoke(messages))
+
+    def _parse_response(self, message) -> StructuredResponse:
+        """Parse an LLM message into a StructuredResponse.
+
+        Fast path: strip any code fence and hand the JSON straight to
+        pydantic-core. The regex-extract + retry machinery of the fixing
+        parser only runs when that fails.
+        """
+        text = message.content if hasattr(message, "content") else str(message)
         try:
-            result = self.chain.invoke({
-                "file_content": file_content,
-                "target_jdk": Config.TARGET_JDK_VERSION
-            })
+            return StructuredResponse.model_validate_json(_strip_fences(text))
+        except Exception:
+            if self._fixing_parser is None:
+                # Racing threads may both build one; that's benign.
+                self._fixing_parser = OutputFixingParser.from_llm(
+                    parser=_get_base_parser(), llm=self.llm)
+            return self._fixing_parser.parse(text)
+
+    def analyze_batch(
+        self, files: List[Tuple[str, str]]
+    ) -> List[StructuredResponse]:
+        """Analyze several (file_path, content) pairs in one LLM call.
 
-            for change in result.changes:
+        Amortizes the static prompt sections over the batch: files are
+        delimited inline, the model tags each change with the marked
+        path, and changes are regrouped into one response per file.
+        Only responses that actually carry changes are returned.
+        """
+        if len(files) == 1:
+            file_path, content = files[0]
+            response = self.analyze(content, file_path)
+            return [response] if response and response.changes else []
+
+        combined = (
+            "Multiple files follow, each delimited by"
+            ' <<FILE path="...">> / <<END FILE>> markers.'
+            " Analyze each file independently, set location.file_path to"
+            " the marked path on every change, and count line numbers"
+            " from 1 within each file.\n\n"
+            + "\n\n".join(
+                f'<<FILE path="{file_path}">>\n{content}\n<<END FILE>>'
+                for file_path, content in files)
+        )
+
+        try:
+            result = self._invoke(combined)
+        except Exception:
+            # %s formatting is deferred until a handler actually emits
+            log.exception("Failed to analyze batch of %d files", len(files))
+            return []
+
+        valid_paths = {file_path for file_path, _ in files}
+        changes_by_path = {}
+        for change in result.changes:
+            path = change.location.file_path
+            if path not in valid_paths:
+                self.console.print(
+                    f"Dropping change for unknown path {path}", style="yellow")
+                continue
+            changes_by_path.setdefault(path, []).append(change)
+
+        return [
+            StructuredResponse(summary=result.summary, changes=changes)
+            for changes in changes_by_path.values()
+        ]
+
+    @staticmethod
+    def _normalize_for_cache(file_content: str) -> str:
+        """Canonical form of content for cache keying.
+
+        Near-duplicate files across a monorepo often differ only in
+        trailing whitespace; normalizing that away lets them share one
+        cached response. Blank lines stay significant: a shared response
+        carries the leader file's line numbers, and inserts are applied
+        by line number with no content check, so content shifted by even
+        one blank line must not share a key.
+        """
+        return "\n".join(
+            line.rstrip() for line in file_content.splitlines())
+
+    def _content_key(self, file_content: str) -> str:
+        """Hash identifying content under the current prompts and target."""
+        return hashlib.sha256(
+            (self._normalize_for_cache(file_content)
+             + CONFIG.TARGET_JDK_VERSION
+             + self._prompt_fingerprint).encode()).hexdigest()
+
+    def _cache_path(self, key: str) -> Path:
+        """On-disk cache location for a content key."""
+        return Path(CONFIG.CACHE_DIR) / f"{key}.json"
+
+    def _cache_get(self, key: str) -> Optional[StructuredResponse]:
+        """Return a previously cached response, or None on miss."""
+        if CONFIG.NO_CACHE:
+            return None
+        try:
+            raw = self._cache_path(key).read_bytes()
+            return StructuredResponse.model_validate_json(raw)
+        except Exception:
+            # Missing or corrupt entry; treat as a miss
+            return None
+
+    def _cache_put(self, key: str, result: StructuredResponse):
+        """Persist a response; cache failures never fail the analysis."""
+        if CONFIG.NO_CACHE:
+            return
+        try:
+            path = self._cache_path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(result.model_dump_json())
+        except OSError:
+            pass
+
+    def _retarget(self, result: StructuredResponse,
+                  file_path: str) -> StructuredResponse:
+        """Point every change in a response at file_path.
+
+        Plain assignment here is a dict store, not a re-validation:
+        validate_assignment is off on these models. Skip the write
+        when the parsed path already matches (e.g. batch responses).
+        """
+        for change in result.changes:
+            if change.location.file_path != file_path:
                 change.location.file_path = file_path
+        return result
+
+    def analyze(self, file_content: str, file_path: str) -> StructuredResponse:
+        """Analyze code for JDK upgrade opportunities."""
+        key = self._content_key(file_content)
+
+        # Duplicate already analyzed this run: project its response onto
+        # this path. Deep copy so per-file path rewrites don't alias.
+        memo = self._analyzed.get(key)
+        if memo is not None:
+            return self._retarget(memo.model_copy(deep=True), file_path)
 
-            return result
+        with self._inflight_lock:
+            done = self._inflight.get(key)
+            leader = done is None
+            if leader:
+                done = self._inflight[key] = threading.Event()
 
+        if not leader:
+            # Another worker is analyzing identical content right now;
+            # wait for it instead of issuing a redundant LLM call.
+            done.wait()
+            memo = self._analyzed.get(key)
+            if memo is None:
+                # The leader failed; make our own attempt.
+                return self.analyze(file_content, file_path)
+            return self._retarget(memo.model_copy(deep=True), file_path)
+
+        # NOTE: deliberately a blocking invoke, not stream(): the response
+        # is one JSON document that must parse as a whole, and the writer
+        # only renders complete per-file responses. Incremental parsing
+        # would buy nothing while file-level calls already overlap on the
+        # pipeline's thread pool.
+        try:
+            result = self._cache_get(key)
+            if result is None:
+                result = self._invoke(file_content)
+                self._cache_put(key, result)
+            # Memoize a pristine copy: callers mutate the returned
+            # response in place (path and line-number rewrites), and the
+            # memo must keep the coordinates the LLM produced.
+            self._analyzed[key] = result.model_copy(deep=True)
+            return self._retarget(result, file_path)
         except Exception as e:
-            self.console.print(f"Failed to analyze code: {e}", style="red")
+            log.exception("Failed to analyze %s", file_path)
             return StructuredResponse(
                 summary=f"Failed to analyze due to parsing error: {str(e)}",
                 changes=[]
             )
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            done.set()
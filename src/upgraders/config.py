@@ -1,3 +1,6 @@
+import re
+
+
 class UpgraderConfig:
     MAX_BLOCK_LINES = 20
 
@@ -41,18 +44,15 @@ class UpgraderConfig:
         r"new\s+Thread\(",
         r"Thread\.start\(\)",
 
-        # Optional Improvements
-        r"if\s*\([^)]*!=\s*null\)",
-        r"if\s*\([^)]*==\s*null\)",
+        # Optional Improvements (== and != null checks share one branch)
+        r"if\s*\([^)]*[!=]=\s*null\)",
 
         # Stream API Opportunities
         r"for\s*\([^)]*:\s*\w+\)",
-        r"\.size\(\)\s*>\s*0",
-        r"\.length\s*>\s*0",
+        r"\.(?:size\(\)|length)\s*>\s*0",
 
         # Try-with-resources
-        r"try\s*\{[^}]*\.close\(\)",
-        r"finally\s*\{[^}]*\.close\(\)",
+        r"(?:try|finally)\s*\{[^}]*\.close\(\)",
 
         # Deprecated/Removed APIs
         r"sun\.misc\.",
@@ -120,9 +120,8 @@ class UpgraderConfig:
     ]
 
     UPGRADE_KEYWORDS_KOTLIN = [
-        # JVM Target
-        r"jvmTarget\s*=\s*['\"]1\.[8-9]['\"]",
-        r"jvmTarget\s*=\s*['\"]11['\"]",
+        # JVM Target (pre-21 versions)
+        r"jvmTarget\s*=\s*['\"](?:1\.[8-9]|11)['\"]",
 
         # Kotlin Version
         r"kotlin_version\s*=",
@@ -153,3 +152,14 @@ class UpgraderConfig:
         r"apiVersion\s*=",
         r"languageVersion\s*=",
     ]
+
+    # Combined alternations, compiled once at import. One pass over the
+    # whole file answers "does this contain anything upgradable at all?"
+    # without running every keyword pattern individually, so files with
+    # no candidates are rejected before block extraction or LLM calls.
+    UPGRADE_RE_JAVA = re.compile(
+        "|".join(f"(?:{p})" for p in UPGRADE_KEYWORDS_JAVA))
+    UPGRADE_RE_GROOVY = re.compile(
+        "|".join(f"(?:{p})" for p in UPGRADE_KEYWORDS_GROOVY))
+    UPGRADE_RE_KOTLIN = re.compile(
+        "|".join(f"(?:{p})" for p in UPGRADE_KEYWORDS_KOTLIN))
@@ -1,5 +1,7 @@
 import os
 
+from config import CONFIG
+
 LOGIC_PRESERVATION_PROMPT = """
 **CRITICAL: PRESERVE BUSINESS LOGIC**
 
@@ -64,19 +66,23 @@ KOTLIN_SAFE_EXAMPLES = """
 """
 
 
+# Assembled once at import; the lookup below hands out the prebuilt
+# string instead of re-concatenating these multi-KB blocks per call.
+_LOGIC_PRESERVATION_PROMPTS = {
+    "java": f"{LOGIC_PRESERVATION_PROMPT}\n\n{JAVA_SAFE_EXAMPLES}",
+    "groovy": f"{LOGIC_PRESERVATION_PROMPT}\n\n{GROOVY_SAFE_EXAMPLES}",
+    "kotlin": f"{LOGIC_PRESERVATION_PROMPT}\n\n{KOTLIN_SAFE_EXAMPLES}",
+}
+_LOGIC_PRESERVATION_DEFAULT = f"{LOGIC_PRESERVATION_PROMPT}\n\n"
+
+
 def get_logic_preservation_prompt(language: str) -> str:
     """Get language-specific logic preservation prompt."""
-    examples_map = {
-        "java": JAVA_SAFE_EXAMPLES,
-        "groovy": GROOVY_SAFE_EXAMPLES,
-        "kotlin": KOTLIN_SAFE_EXAMPLES,
-    }
+    return _LOGIC_PRESERVATION_PROMPTS.get(
+        language.lower(), _LOGIC_PRESERVATION_DEFAULT)
 
-    examples = examples_map.get(language.lower(), "")
-    return f"{LOGIC_PRESERVATION_PROMPT}\n\n{examples}"
 
-
-CHANGE_PROMPT = """
+_CHANGE_PROMPT_TEMPLATE = """
     For each change needed, specify the change type and provide appropriate details:
 
     **INSERT changes** (adding new code):
@@ -111,6 +117,13 @@ CHANGE_PROMPT = """
         together rather than separate changes for each line.
 """
 
+# Rendered once at import. PromptTemplate.format is single-pass, so a
+# {target_jdk} left inside a partial variable would reach the model as a
+# literal placeholder; pre-rendering fixes that and skips re-scanning
+# this multi-KB block on every analyze() call.
+CHANGE_PROMPT = _CHANGE_PROMPT_TEMPLATE.format(
+    target_jdk=CONFIG.TARGET_JDK_VERSION)
+
 # NOTE: Use this to experiment and fine-tune the responses.
 # Prefer to write here than in the upgrader classes' PROMPT to save tokens
 EXTRA_PROMPT = "\n\n".join([
@@ -1,9 +1,13 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 from rich.console import Console
 from rich.progress import Progress, TextColumn,  TaskProgressColumn, TimeElapsedColumn
 
-from config import Config
+from config import BUILD_FILE_NAMES, CI_FILE_NAMES, CONFIG, SKIP_DIRS, SOURCE_SUFFIXES
 from src.models.response import StructuredResponse
 from src.upgraders.build_upgrader import BuildUpgrader
 from src.upgraders.ci_upgrader import CIUpgrader
@@ -13,31 +17,86 @@ from src.upgraders.groovy_upgrader import GroovyUpgrader
 from src.upgraders.kotlin_upgrader import KotlinUpgrader
 from src.utils.code_extractor import CodeBlockExtractor
 
+# Rough prompt-size cap per build-file batch, using the cheap
+# ~4 chars/token estimate (~6k tokens of file content).
+_BATCH_CHAR_BUDGET = 24_000
+
+# Files below this (stripped) size are placeholders not worth a round-trip.
+_MIN_CONTENT_LEN = 32
+
+# Files above this are almost always generated (minified bundles,
+# protobuf output) and would blow the prompt budget anyway.
+_MAX_FILE_BYTES = 1 << 20
+
+# Build files that already pin the target JDK need no analysis.
+_ON_TARGET_RE = re.compile(
+    rf"JavaVersion\.VERSION_{CONFIG.TARGET_JDK_VERSION}\b"
+    rf"|<maven\.compiler\.release>{CONFIG.TARGET_JDK_VERSION}<")
+
+# Relevance pre-filters: a file with none of these indicators carries no
+# JDK version to upgrade (a Node-only CI config, a settings.gradle that
+# just lists modules), so it is skipped without an LLM round-trip.
+_CI_RELEVANT_RE = re.compile(
+    r"setup-java|java-version|openjdk:|jdk:?\s*\d|JAVA_HOME"
+    r"|eclipse-temurin|corretto|maven:|gradle:")
+_BUILD_RELEVANT_RE = re.compile(
+    r"sourceCompatibility|targetCompatibility|JavaVersion|toolchain"
+    r"|jvmTarget|maven\.compiler|<java\.version>|distributionUrl")
+
 
 class UpgradePipeline:
     """Orchestrates JDK upgrade analysis across all file types."""
 
     def __init__(self, llm, console=None):
+        self.llm = llm
         self.build_upgrader = BuildUpgrader(llm)
         self.ci_upgrader = CIUpgrader(llm)
-        self.java_upgrader = JavaUpgrader(llm)
-        self.groovy_upgrader = GroovyUpgrader(llm)
-        self.kotlin_upgrader = KotlinUpgrader(llm)
         self.code_extractor = CodeBlockExtractor(
             max_block_lines=UpgraderConfig.MAX_BLOCK_LINES, console=console)
         self.console = console or Console()
+        # Built once; _get_language_tools runs per source file and the
+        # routing table never changes after construction. The language
+        # upgraders themselves are constructed on first use, so a repo
+        # with no Kotlin never pays for KotlinUpgrader's prompt render.
+        self._language_tools = {
+            ".java": (UpgraderConfig.UPGRADE_KEYWORDS_JAVA,
+                      UpgraderConfig.UPGRADE_RE_JAVA, JavaUpgrader),
+            ".groovy": (UpgraderConfig.UPGRADE_KEYWORDS_GROOVY,
+                        UpgraderConfig.UPGRADE_RE_GROOVY, GroovyUpgrader),
+            ".kt": (UpgraderConfig.UPGRADE_KEYWORDS_KOTLIN,
+                    UpgraderConfig.UPGRADE_RE_KOTLIN, KotlinUpgrader),
+        }
+        self._upgraders = {}
+        self._upgraders_lock = threading.Lock()
 
     def analyze_repository(self, repo_path: Path) -> List[StructuredResponse]:
         """Analyze repository for JDK upgrade opportunities."""
         all_responses = []
 
         # Collect all files by type
-        build_files = self._collect_files(repo_path, Config.BUILD_FILES)
-        ci_files = self._collect_files(repo_path, Config.CI_FILES)
-        source_files = self._collect_files(repo_path, Config.SOURCE_FILES)
+        build_files, ci_files, source_files = self._walk_repository_files(
+            repo_path)
+
+        # Largest sources first: their prompts take longest to analyze,
+        # so starting them early keeps the pool busy at the tail instead
+        # of waiting on one big straggler.
+        source_files.sort(key=lambda p: p.stat().st_size, reverse=True)
 
         total_files = len(build_files) + len(ci_files) + len(source_files)
 
+        # The walk only yields paths under repo_path, so the relative
+        # path is a fixed-length prefix slice — no per-file PurePath
+        # allocation in the progress closure. Path construction in the
+        # walk normalizes "./" away, so "." contributes no prefix at
+        # all; roots already ending in a separator (e.g. "/") must not
+        # have another one counted.
+        prefix = str(repo_path)
+        if prefix == ".":
+            prefix = ""
+        elif not prefix.endswith(os.sep):
+            prefix += os.sep
+        repo_prefix_len = len(prefix)
+
         with Progress(
             TextColumn("{task.description}\n"),
             TaskProgressColumn(),
@@ -46,60 +105,210 @@ class UpgradePipeline:
         ) as progress:
             task = progress.add_task("Analyzing files...", total=total_files)
 
+            # Workers only bump a counter under a micro-lock; a single
+            # refresher thread does the (comparatively heavy) Rich
+            # update at 10Hz, so N workers never contend on Rich's
+            # internal render lock.
+            state_lock = threading.Lock()
+            state = {"done": 0, "current": ""}
+            stop = threading.Event()
+
+            def refresh_progress():
+                while True:
+                    finished = stop.wait(0.1)
+                    with state_lock:
+                        done = state["done"]
+                        current = state["current"]
+                    description = (
+                        f"Analyzing {current}..." if current
+                        else "Analyzing files...")
+                    progress.update(
+                        task, completed=done, description=description)
+                    if finished:
+                        break
+
             def process_file(file_path, analyzer_func):
                 try:
-                    relative_path = str(file_path.relative_to(repo_path))
+                    relative_path = str(file_path)[repo_prefix_len:]
                     if len(relative_path) > 60:
                         relative_path = "..." + relative_path[-57:]
 
-                    progress.update(
-                        task, description=f"Analyzing {relative_path}...")
+                    with state_lock:
+                        state["current"] = relative_path
                     return analyzer_func(file_path)
                 except Exception as e:
                     self.console.print(
                         f"[yellow]Warning: Failed to analyze {file_path}: {e}[/yellow]")
                     return None
                 finally:
-                    progress.advance(task)
+                    with state_lock:
+                        state["done"] += 1
 
-            for file_path in build_files:
-                response = process_file(file_path, self._analyze_build_file)
-                if response and response.changes:
-                    all_responses.append(response)
+            def process_build_batch(batch):
+                try:
+                    with state_lock:
+                        state["current"] = f"{len(batch)} build files"
+                    return self._analyze_build_batch(batch)
+                except Exception as e:
+                    self.console.print(
+                        f"[yellow]Warning: Failed to analyze batch: {e}[/yellow]")
+                    return None
+                finally:
+                    with state_lock:
+                        state["done"] += len(batch)
 
-            for file_path in ci_files:
-                response = process_file(file_path, self._analyze_ci_file)
-                if response and response.changes:
-                    all_responses.append(response)
+            refresher = threading.Thread(target=refresh_progress, daemon=True)
+            refresher.start()
 
-            for file_path in source_files:
-                responses = process_file(file_path, self._analyze_source_file)
-                if responses:
-                    all_responses.extend(responses)
+            # Each analysis is a blocking HTTPS round-trip, so the workload
+            # is I/O-bound; overlapping the calls hides the per-file RTT.
+            # Build files ride together in small batches to amortize the
+            # static prompt sections.
+            try:
+                with ThreadPoolExecutor(max_workers=CONFIG.MAX_WORKERS) as executor:
+                    futures = [
+                        executor.submit(process_build_batch, batch)
+                        for batch in self._batch_files(build_files)
+                    ]
+                    futures += [
+                        executor.submit(process_file, f, self._analyze_ci_file)
+                        for f in ci_files
+                    ]
+                    futures += [
+                        executor.submit(
+                            process_file, f, self._analyze_source_file)
+                        for f in source_files
+                    ]
+                    for future in as_completed(futures):
+                        result = future.result()
+                        if not result:
+                            continue
+                        if isinstance(result, list):
+                            all_responses.extend(result)
+                        elif result.changes:
+                            all_responses.append(result)
+            finally:
+                stop.set()
+                refresher.join()
 
         return all_responses
 
-    def _collect_files(self, repo_path: Path, patterns: List[str]) -> List[Path]:
-        """Collect files matching glob patterns."""
-        files = []
-        for pattern in patterns:
-            files.extend(repo_path.glob(pattern))
-        return files
+    def _walk_repository_files(
+        self, repo_path: Path
+    ) -> Tuple[List[Path], List[Path], List[Path]]:
+        """Collect build, CI, and source files in a single walk of the tree.
+
+        One os.walk pass replaces one glob (= one full tree walk) per
+        pattern: build and CI files are probed against frozensets of
+        basenames, source files against a frozenset of suffixes, and
+        directories that never contain files worth analyzing are pruned.
+        """
+        build_files = []
+        ci_files = []
+        source_files = []
+        for dirpath, dirnames, filenames in os.walk(repo_path):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for name in filenames:
+                if name in BUILD_FILE_NAMES:
+                    build_files.append(Path(dirpath) / name)
+                elif name in CI_FILE_NAMES:
+                    ci_files.append(Path(dirpath) / name)
+                elif os.path.splitext(name)[1] in SOURCE_SUFFIXES:
+                    source_files.append(Path(dirpath) / name)
+        return build_files, ci_files, source_files
+
+    @staticmethod
+    def _read_text(file_path: Path) -> str:
+        """Read a file as one bytes syscall and decode once.
+
+        Skips text-mode buffering and universal-newline translation, and
+        tolerates the odd non-UTF-8 byte in legacy source files.
+        """
+        return file_path.read_bytes().decode("utf-8", errors="replace")
+
+    def _should_skip(self, file_path, content: str,
+                     check_on_target: bool = False,
+                     relevance_re=None) -> bool:
+        """Cheap pre-filter that saves an LLM round-trip on no-op files."""
+        if len(content.strip()) < _MIN_CONTENT_LEN:
+            self.console.print(
+                f"Skipping {file_path}: trivial content", style="dim")
+            return True
+        if len(content) > _MAX_FILE_BYTES:
+            self.console.print(
+                f"Skipping {file_path}: over {_MAX_FILE_BYTES >> 20} MB,"
+                " likely generated", style="dim")
+            return True
+        if relevance_re is not None and not relevance_re.search(content):
+            self.console.print(
+                f"Skipping {file_path}: no JDK version indicators",
+                style="dim")
+            return True
+        if check_on_target and _ON_TARGET_RE.search(content):
+            self.console.print(
+                f"Skipping {file_path}: already targets JDK "
+                f"{CONFIG.TARGET_JDK_VERSION}", style="dim")
+            return True
+        return False
 
     def _analyze_build_file(self, file_path: Path) -> StructuredResponse:
         """Analyze single build file."""
         try:
-            content = file_path.read_text()
+            content = self._read_text(file_path)
+            if self._should_skip(file_path, content, check_on_target=True,
+                                 relevance_re=_BUILD_RELEVANT_RE):
+                return None
             return self.build_upgrader.analyze(content, str(file_path))
         except Exception as e:
             self.console.print(
                 f"❌ Error analyzing {file_path}: {e}", style="red")
             return None
 
+    def _analyze_build_batch(
+        self, batch: List[Path]
+    ) -> List[StructuredResponse]:
+        """Analyze a batch of build files in one LLM call."""
+        try:
+            files = []
+            for f in batch:
+                content = self._read_text(f)
+                if not self._should_skip(f, content, check_on_target=True,
+                                         relevance_re=_BUILD_RELEVANT_RE):
+                    files.append((str(f), content))
+            if not files:
+                return []
+            return self.build_upgrader.analyze_batch(files)
+        except Exception as e:
+            self.console.print(
+                f"❌ Error analyzing build batch: {e}", style="red")
+            return []
+
+    @staticmethod
+    def _batch_files(files: List[Path]) -> List[List[Path]]:
+        """Chunk files into LLM batches bounded by count and total size."""
+        batches = []
+        current = []
+        current_chars = 0
+        for file_path in files:
+            size = file_path.stat().st_size
+            if current and (len(current) >= CONFIG.BATCH_SIZE
+                            or current_chars + size > _BATCH_CHAR_BUDGET):
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(file_path)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+
     def _analyze_ci_file(self, file_path: Path) -> StructuredResponse:
         """Analyze single CI file."""
         try:
-            content = file_path.read_text()
+            content = self._read_text(file_path)
+            if self._should_skip(file_path, content,
+                                 relevance_re=_CI_RELEVANT_RE):
+                return None
             return self.ci_upgrader.analyze(content, str(file_path))
         except Exception as e:
             self.console.print(
@@ -109,12 +318,23 @@ class UpgradePipeline:
     def _analyze_source_file(self, file_path: Path) -> List[StructuredResponse]:
         """Analyze source file, extracting modernizable code blocks."""
         try:
-            content = file_path.read_text()
+            content = self._read_text(file_path)
+            if len(content) > _MAX_FILE_BYTES:
+                self.console.print(
+                    f"Skipping {file_path}: over {_MAX_FILE_BYTES >> 20} MB,"
+                    " likely generated", style="dim")
+                return []
 
-            keywords, upgrader = self._get_language_tools(file_path)
+            keywords, combined_re, upgrader = self._get_language_tools(
+                file_path)
             if not upgrader:
                 return []
 
+            # One combined-alternation pass rejects files with no
+            # upgradable constructs before any per-keyword scanning.
+            if not combined_re.search(content):
+                return []
+
             blocks = self.code_extractor.extract_blocks(
                 str(file_path), content, keywords
             )
@@ -123,13 +343,37 @@ class UpgradePipeline:
                 return []
 
             responses = []
-            for block in blocks:
+            if len(blocks) == 1:
+                block = blocks[0]
                 response = upgrader.analyze(block.content, str(file_path))
                 if response and response.changes:
                     for change in response.changes:
                         change.location.start_line += block.start_line - 1
                         change.location.end_line += block.start_line - 1
                     responses.append(response)
+                return responses
+
+            # All blocks of a file ride in one LLM call instead of one
+            # round-trip per block. Each block is marked with a synthetic
+            # "path#L<start>" so its changes can be offset back to real
+            # file lines afterwards (block start lines are unique).
+            block_offsets = {}
+            entries = []
+            for block in blocks:
+                marker = f"{file_path}#L{block.start_line}"
+                block_offsets[marker] = block.start_line - 1
+                entries.append((marker, block.content))
+
+            for response in upgrader.analyze_batch(entries):
+                if not response.changes:
+                    continue
+                offset = block_offsets.get(
+                    response.changes[0].location.file_path, 0)
+                for change in response.changes:
+                    change.location.start_line += offset
+                    change.location.end_line += offset
+                    change.location.file_path = str(file_path)
+                responses.append(response)
 
             return responses
 
@@ -139,12 +383,16 @@ class UpgradePipeline:
             return []
 
     def _get_language_tools(self, file_path: Path):
-        """Get modernization keywords and upgrader for file type."""
-
-        suffix_map = {
-            ".java": (UpgraderConfig.UPGRADE_KEYWORDS_JAVA, self.java_upgrader),
-            ".groovy": (UpgraderConfig.UPGRADE_KEYWORDS_GROOVY, self.groovy_upgrader),
-            ".kt": (UpgraderConfig.UPGRADE_KEYWORDS_KOTLIN, self.kotlin_upgrader)
-        }
-
-        return suffix_map.get(file_path.suffix, ([], None))
+        """Get modernization keywords, prefilter, and upgrader for file type."""
+        entry = self._language_tools.get(file_path.suffix)
+        if entry is None:
+            return [], None, None
+        keywords, combined_re, upgrader_cls = entry
+        # One instance per language, built under a lock so concurrent
+        # workers share its analysis memo instead of splitting it.
+        with self._upgraders_lock:
+            upgrader = self._upgraders.get(upgrader_cls)
+            if upgrader is None:
+                upgrader = self._upgraders[upgrader_cls] = upgrader_cls(
+                    self.llm, self.console)
+            return keywords, combined_re, upgrader
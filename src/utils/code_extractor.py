@@ -1,12 +1,30 @@
 import re
+from bisect import bisect_right
+from functools import lru_cache
 from typing import List, Tuple
 from dataclasses import dataclass
 from rich.console import Console
 
 
-@dataclass
+@lru_cache(maxsize=8)
+def _combined_pattern(keywords: Tuple[str, ...]) -> "re.Pattern":
+    """Fuse a keyword list into one alternation, compiled once per list.
+
+    Each keyword gets a named branch (k0, k1, ...) so a single search
+    still identifies which keyword hit; inner unnamed groups inside the
+    patterns don't show up in groupdict and can't confuse the mapping.
+    """
+    return re.compile(
+        "|".join(f"(?P<k{i}>{p})" for i, p in enumerate(keywords)))
+
+
+@dataclass(frozen=True, slots=True)
 class CodeBlock:
-    """Represents an extracted code block."""
+    """Represents an extracted code block.
+
+    Frozen with slots: blocks are created in bulk during a repo scan and
+    never mutated, so slotted instances skip the per-instance dict.
+    """
 
     content: str
     start_line: int
@@ -60,8 +78,19 @@ class CodeBlockExtractor:
         Returns:
             List of extracted and merged code blocks
         """
+        # Split once; every step below works on the same list instead of
+        # re-materializing the lines from content per helper call.
+        # split("\n") rather than splitlines(): the latter also breaks
+        # on form feeds and friends, which would desynchronize the list
+        # from the \n-only offset table below.
+        # line_starts[i] is the offset where line i+1 begins; it serves
+        # both the match-to-line mapping and the block content slicing.
+        lines = content.split("\n")
+        line_starts = self._line_starts(content)
+
         # Step 1: Find all keyword matches with line numbers
-        keyword_matches = self._find_keyword_matches(content, keywords)
+        keyword_matches = self._find_keyword_matches(
+            content, keywords, line_starts)
 
         if not keyword_matches:
             return []
@@ -69,7 +98,7 @@ class CodeBlockExtractor:
         # Step 2: For each match, find the enclosing code block
         raw_blocks = []
         for match in keyword_matches:
-            block = self._find_enclosing_block(content, match)
+            block = self._find_enclosing_block(lines, match)
             if block:
                 raw_blocks.append(block)
 
@@ -80,7 +109,7 @@ class CodeBlockExtractor:
         code_blocks = []
         for start_line, end_line, matched_keywords in merged_blocks:
             block_content = self._extract_block_content(
-                content, start_line, end_line)
+                content, line_starts, start_line, end_line)
             code_block = CodeBlock(
                 content=block_content,
                 start_line=start_line,
@@ -95,48 +124,67 @@ class CodeBlockExtractor:
 
         return code_blocks
 
+    @staticmethod
+    def _line_starts(content: str) -> List[int]:
+        """Build the table of offsets where each line begins."""
+        line_starts = [0]
+        pos = content.find("\n")
+        while pos != -1:
+            line_starts.append(pos + 1)
+            pos = content.find("\n", pos + 1)
+        return line_starts
+
     def _find_keyword_matches(
-        self, content: str, keywords: List[str]
+        self, content: str, keywords: List[str], line_starts: List[int]
     ) -> List[Tuple[int, str]]:
         """
         Find all lines containing upgrade keywords.
 
+        One finditer pass over the whole content replaces the per-line
+        loop; match offsets map back to line numbers by bisecting the
+        prebuilt table of line-start offsets.
+
         Args:
             content: File content to search
             keywords: List of regex patterns
+            line_starts: Offsets where each line begins
 
         Returns:
             List of(line_number, matched_keyword) tuples
         """
+        combined = _combined_pattern(tuple(keywords))
+
         matches = []
-        lines = content.splitlines()
-
-        # For each line in the file
-        for line_num, line in enumerate(lines, 1):
-            # Check each keyword pattern
-            for keyword in keywords:
-                if re.search(keyword, line):
-                    matches.append((line_num, keyword))
-                    # Don't match multiple keywords on same line to avoid duplicates
+        last_line = 0
+        for match in combined.finditer(content):
+            line_num = bisect_right(line_starts, match.start())
+            # Matches arrive in offset order, so a repeat line number is
+            # always the previous one; keep the old first-match-per-line
+            # behavior.
+            if line_num == last_line:
+                continue
+            last_line = line_num
+            for name, value in match.groupdict().items():
+                if value is not None:
+                    matches.append((line_num, keywords[int(name[1:])]))
                     break
 
         return matches
 
     def _find_enclosing_block(
-        self, content: str, match: Tuple[int, str]
+        self, lines: List[str], match: Tuple[int, str]
     ) -> Tuple[int, int, str]:
         """
         Find the smallest enclosing code block for a keyword match.
 
         Args:
-            content: File content
+            lines: File content as a list of lines
             match: (line_number, keyword) tuple
 
         Returns:
             (start_line, end_line, keyword) tuple or None if no block found
         """
         line_num, keyword = match
-        lines = content.splitlines()
 
         # Step 1: Start from the matched line and scan backwards for opening brace
         # Look for patterns like: if (...) {, method() {, class Name {
@@ -171,14 +219,21 @@ class CodeBlockExtractor:
             # Step 2: Look for opening brace patterns
             # - Method/class declarations: ") {", "} {", "class X {"
             # - Control structures: "if (...) {", "for (...) {", etc.
-            if re.search(r"[{]\s*$", line):  # Line ends with opening brace
+            # Plain string methods: the line is already stripped, so
+            # these are the same lexical checks the old per-line regexes
+            # made without entering the regex engine.
+            if line.endswith("{"):
                 return i + 1  # Convert back to 1-indexed
 
             # Step 3: Stop if we hit certain boundary patterns
             # - Another closing brace (end of previous block)
             # - Package/import statements
             # - Class-level annotations
-            if re.search(r"[}]\s*$|^package\s|^import\s|^@\w+", line):
+            if (line.endswith("}")
+                    or (line.startswith("package") and line[7:8].isspace())
+                    or (line.startswith("import") and line[6:7].isspace())
+                    or (line.startswith("@")
+                        and (line[1:2].isalnum() or line[1:2] == "_"))):
                 break
 
         # Step 4: If no opening brace found, return original line
@@ -201,51 +256,78 @@ class CodeBlockExtractor:
 
         # Step 2: Start from the start line and scan forward
         for i in range(start_line - 1, len(lines)):  # Convert to 0-indexed
-            line = lines[i]
+            # Step 3: Count only braces that are real code
+            opens, closes = self._count_code_braces(lines[i])
+            brace_count += opens - closes
 
-            # Step 3: Count opening and closing braces
-            # Handle braces in strings/comments by simple heuristic
-            if not self._is_in_string_or_comment(line):
-                brace_count += line.count("{")
-                brace_count -= line.count("}")
+            # Mark that we've seen at least one opening brace
+            if opens:
+                found_opening = True
 
-                # Mark that we've seen at least one opening brace
-                if "{" in line:
-                    found_opening = True
-
-                # Step 4: When brace count returns to 0, we found the end
-                if found_opening and brace_count == 0:
-                    return i + 1  # Convert back to 1-indexed
+            # Step 4: When brace count returns to 0, we found the end
+            if found_opening and brace_count == 0:
+                return i + 1  # Convert back to 1-indexed
 
         # Step 5: If no matching brace found, return start line
         return start_line
 
-    def _is_in_string_or_comment(self, line: str) -> bool:
+    @staticmethod
+    def _count_code_braces(line: str) -> Tuple[int, int]:
         """
-        Simple heuristic to check if braces are in strings or comments.
+        Count braces outside string literals and comments.
+
+        A single character walk replaces the old two-re.sub + recount
+        heuristic: it tracks quoted literals (with escapes), stops at
+        a // comment, and skips /* ... */ sections that close on the
+        same line. Per-line, like the heuristic it replaces, so a block
+        comment spanning lines is still approximated.
 
         Args:
             line: Line of code to check
 
         Returns:
-            True if line appears to be mostly string/comment content
+            (opening_braces, closing_braces) found in actual code
         """
-        # Step 1: Remove string literals (simple approach)
-        # This is not perfect but good enough for most cases
-        line_no_strings = re.sub(r'"[^"]*"', "", line)
-        line_no_strings = re.sub(r"'[^']*'", "", line_no_strings)
-
-        # Step 2: Check if remaining line starts with comment
-        stripped = line_no_strings.strip()
-        if stripped.startswith("//") or stripped.startswith("/*"):
-            return True
-
-        # Step 3: Simple heuristic - if most braces were removed, probably in strings
-        original_braces = line.count("{") + line.count("}")
-        remaining_braces = line_no_strings.count(
-            "{") + line_no_strings.count("}")
-
-        return original_braces > 0 and remaining_braces == 0
+        # Fast path: without quotes or slashes nothing on the line can
+        # open a literal or comment, so the raw C-level counts are
+        # already exact and the character walk is skipped entirely.
+        if '"' not in line and "'" not in line and "/" not in line:
+            return line.count("{"), line.count("}")
+
+        opens = closes = 0
+        quote = None
+        escaped = False
+        in_block_comment = False
+        i = 0
+        n = len(line)
+        while i < n:
+            ch = line[i]
+            if in_block_comment:
+                if ch == "*" and i + 1 < n and line[i + 1] == "/":
+                    in_block_comment = False
+                    i += 1
+            elif quote:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == quote:
+                    quote = None
+            elif ch in "\"'":
+                quote = ch
+            elif ch == "/" and i + 1 < n:
+                nxt = line[i + 1]
+                if nxt == "/":
+                    break
+                if nxt == "*":
+                    in_block_comment = True
+                    i += 1
+            elif ch == "{":
+                opens += 1
+            elif ch == "}":
+                closes += 1
+            i += 1
+        return opens, closes
 
     def _merge_blocks(
         self, blocks: List[Tuple[int, int, str]]
@@ -266,53 +348,70 @@ class CodeBlockExtractor:
             start, end, keyword = blocks[0]
             return [(start, end, [keyword])]
 
-        # Step 1: Sort blocks by start line
-        sorted_blocks = sorted(blocks, key=lambda x: x[0])
+        # Step 1: Ensure blocks are sorted by start line. Matches arrive
+        # in file order, but _find_block_start scans backwards, so a later
+        # match can occasionally open an earlier block; sort only when
+        # that actually happened instead of unconditionally.
+        if any(b[0] < a[0] for a, b in zip(blocks, blocks[1:])):
+            blocks = sorted(blocks, key=lambda x: x[0])
 
-        # Step 2: Merge overlapping/adjacent blocks
+        # Step 2: Merge overlapping/adjacent blocks. Keywords accumulate
+        # in a dict: O(1) membership, first-seen order preserved.
         merged = []
-        current_start, current_end, current_keyword = sorted_blocks[0]
-        current_keywords = [current_keyword]
+        current_start, current_end, current_keyword = blocks[0]
+        current_keywords = {current_keyword: None}
 
-        for start, end, keyword in sorted_blocks[1:]:
+        for start, end, keyword in blocks[1:]:
             # Step 3: Check if blocks overlap or are adjacent (within 2 lines)
             if start <= current_end + 2:
                 # Merge: extend current block and combine keywords
                 current_end = max(current_end, end)
-                if keyword not in current_keywords:
-                    current_keywords.append(keyword)
+                current_keywords[keyword] = None
             else:
                 # No overlap: save current and start new block
-                merged.append((current_start, current_end, current_keywords))
+                merged.append(
+                    (current_start, current_end, list(current_keywords)))
                 current_start, current_end = start, end
-                current_keywords = [keyword]
+                current_keywords = {keyword: None}
 
         # Step 4: Add the last block
-        merged.append((current_start, current_end, current_keywords))
+        merged.append((current_start, current_end, list(current_keywords)))
 
         return merged
 
     def _extract_block_content(
-        self, content: str, start_line: int, end_line: int
+        self, content: str, line_starts: List[int],
+        start_line: int, end_line: int
     ) -> str:
         """
         Extract the actual content of a code block.
 
+        One slice of the original content by precomputed line offsets
+        replaces slicing the lines list and re-joining it per block.
+        Indentation is preserved either way.
+
         Args:
             content: Full file content
+            line_starts: Offsets where each line begins
             start_line: Start line number(1-indexed)
             end_line: End line number(1-indexed, inclusive)
 
         Returns:
             Code block content as string
         """
-        lines = content.splitlines()
-
-        # Step 1: Extract the relevant lines (convert to 0-indexed)
-        block_lines = lines[start_line - 1: end_line]
-
-        # Step 2: Preserve original indentation
-        return "\n".join(block_lines)
+        start_off = line_starts[start_line - 1]
+        end_off = (line_starts[end_line] if end_line < len(line_starts)
+                   else len(content))
+        block = content[start_off:end_off]
+
+        if '\r' in block:
+            # CRLF input: normalize the line endings exactly like the
+            # old splitlines-and-join path did.
+            return "\n".join(block.splitlines())
+        if block.endswith("\n"):
+            # Drop only the final line's terminator, matching the join.
+            return block[:-1]
+        return block
 
     def _validate_block_sizes(self, blocks: List[CodeBlock]) -> None:
         """
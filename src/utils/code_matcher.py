@@ -2,6 +2,22 @@ import re
 from typing import List, Optional, Tuple
 from rich.console import Console
 
+# Fuzzy-match key extraction: quoted strings and identifiers come from
+# one fused pass, with quoted content re-scanned so its inner
+# identifiers still count. Version numbers get their own pass over the
+# raw line because they can sit flush against a word character (jdk1.8,
+# v2.5), where a non-overlapping alternation consumes the prefix as an
+# identifier and never sees the version token.
+_KEY_PATTERN_RE = re.compile(r'["\']([^"\']+)["\']|(\w+)')
+_KEY_SUBTOKEN_RE = re.compile(r'\w+')
+_VERSION_RE = re.compile(r'\d+\.\d+(?:\.\d+)?')
+
+# Common/generic words that aren't helpful for matching
+_GENERIC_WORDS = frozenset({
+    'the', 'and', 'or', 'if', 'then', 'else', 'for', 'while', 'do', 'return',
+    'public', 'private', 'static', 'final', 'class', 'import', 'package'
+})
+
 
 class CodeMatcher:
     """
@@ -69,67 +85,66 @@ class CodeMatcher:
         if not target_lines:
             return None
 
-        # Try to find a contiguous match
-        for start_idx in range(len(file_lines) - len(target_lines) + 1):
-            if self._lines_match_at_position(file_lines, target_lines, start_idx):
+        # Normalize each line exactly once. The old per-line comparison
+        # tried three strategies (whitespace-stripped, trimmed, collapsed
+        # whitespace), but trimmed or collapsed equality both imply
+        # whitespace-stripped equality, so the stripped view is the whole
+        # predicate and is the only one worth materializing.
+        target_nows = [''.join(line.split()) for line in target_lines]
+        file_nows = [''.join(line.split()) for line in file_lines]
+
+        # Per-line fingerprints over the stripped views: a window whose
+        # fingerprints differ can never match, and slice equality on ints
+        # fails at the first mismatch in C, so the scan stays linear. The
+        # string comparison only runs on fingerprint hits, which outside
+        # a real match require a hash collision.
+        target_fp = [hash(s) for s in target_nows]
+        file_fp = [hash(s) for s in file_nows]
+        span = len(target_lines)
+
+        # Jump between candidate starts with list.index, a C-level scan
+        # for the first line's fingerprint; for the common single-line
+        # target that makes the whole search one probe per candidate.
+        first_fp = target_fp[0]
+        limit = len(file_lines) - span
+        pos = 0
+        while pos <= limit:
+            try:
+                start_idx = file_fp.index(first_fp, pos, limit + 1)
+            except ValueError:
+                return None
+
+            if (file_fp[start_idx:start_idx + span] == target_fp
+                    and self._lines_match_at_position(
+                        file_nows, target_nows, start_idx)):
                 # Calculate end index including original empty lines
                 end_idx = self._calculate_end_index(
-                    start_idx, len(target_lines), original_target)
+                    start_idx, span, original_target)
                 end_idx = min(end_idx, len(file_lines))
                 return (start_idx, end_idx)
 
+            pos = start_idx + 1
+
         return None
 
-    def _lines_match_at_position(self, file_lines: List[str], target_lines: List[str],
+    def _lines_match_at_position(self, file_nows: List[str], target_nows: List[str],
                                  start_idx: int) -> bool:
         """
         Check if target lines match file lines starting at given position.
 
-        Args:
-            file_lines: File lines to check against
-            target_lines: Target lines to match
-            start_idx: Starting position in file_lines
-
-        Returns:
-            True if all target lines match starting at start_idx
-        """
-        for i, target_line in enumerate(target_lines):
-            if start_idx + i >= len(file_lines):
-                return False
-
-            file_line = file_lines[start_idx + i]
-            if not self._single_line_match(file_line, target_line):
-                return False
-
-        return True
-
-    def _single_line_match(self, file_line: str, target_line: str) -> bool:
-        """
-        Check if two lines match with whitespace tolerance.
+        Operates on the whitespace-stripped views built by
+        _find_exact_match; one slice equality covers the match with full
+        whitespace tolerance and rules out fingerprint hash collisions.
 
         Args:
-            file_line: Line from file
-            target_line: Line from target content
+            file_nows: Whitespace-stripped file lines
+            target_nows: Whitespace-stripped target lines
+            start_idx: Starting position in file_nows
 
         Returns:
-            True if lines match (with whitespace normalization)
+            True if all target lines match starting at start_idx
         """
-        # Strategy 1: Remove all whitespace and compare
-        file_normalized = ''.join(file_line.split())
-        target_normalized = ''.join(target_line.split())
-
-        if file_normalized == target_normalized:
-            return True
-
-        # Strategy 2: Trim whitespace but preserve internal spacing
-        if file_line.strip() == target_line.strip():
-            return True
-
-        # Strategy 3: Normalize common whitespace patterns
-        file_clean = re.sub(r'\s+', ' ', file_line.strip())
-        target_clean = re.sub(r'\s+', ' ', target_line.strip())
-
-        return file_clean == target_clean
+        return file_nows[start_idx:start_idx + len(target_nows)] == target_nows
 
     def _calculate_end_index(self, start_idx: int, matched_lines: int, original_target: str) -> int:
         """
@@ -174,22 +189,63 @@ class CodeMatcher:
         if not key_patterns:
             return None
 
-        # Find best matching section
-        best_match = None
-        best_score = 0
+        span = len(target_lines)
+        window_count = len(file_lines) - span + 1
+        if window_count <= 0:
+            return None
+
         # At least 70% match or minimum 2 patterns
         threshold = max(len(key_patterns) * 0.7, 2)
 
-        for start_idx in range(len(file_lines) - len(target_lines) + 1):
-            end_idx = start_idx + len(target_lines)
-            section_content = ' '.join(file_lines[start_idx:end_idx])
+        # A pattern without whitespace can't straddle the space that
+        # ' '.join inserts between lines, so one containment pass per
+        # line scores it exactly. Patterns with whitespace (quoted
+        # strings with spaces) can span lines; they are rare, so every
+        # window is granted them up front and the joined-string test
+        # settles them only on windows that survive the threshold.
+        spanning = [p for p in key_patterns
+                    if any(ch.isspace() for ch in p)]
+        simple = [p for p in key_patterns if not any(
+            ch.isspace() for ch in p)]
+
+        # Difference array over window start positions: a hit on line i
+        # credits every window covering i, without rebuilding the joined
+        # window content per start position.
+        deltas = [0] * (window_count + 1)
+        for pattern in simple:
+            covered_until = 0
+            for hit, line in enumerate(file_lines):
+                if pattern not in line:
+                    continue
+                lo = max(hit - span + 1, 0, covered_until)
+                hi = min(hit, window_count - 1)
+                if lo > hi:
+                    continue
+                deltas[lo] += 1
+                deltas[hi + 1] -= 1
+                covered_until = hi + 1
 
-            score = sum(
-                1 for pattern in key_patterns if pattern in section_content)
+        best_match = None
+        best_score = 0
+        bonus = len(spanning)
+        running = 0
+
+        for start_idx in range(window_count):
+            running += deltas[start_idx]
+            upper_bound = running + bonus
+            if upper_bound < threshold or upper_bound <= best_score:
+                continue
+
+            score = running
+            if spanning:
+                section_content = ' '.join(
+                    file_lines[start_idx:start_idx + span])
+                score += sum(
+                    1 for pattern in spanning if pattern in section_content)
 
             if score > best_score and score >= threshold:
                 best_score = score
-                best_match = (start_idx, end_idx)
+                best_match = (start_idx, start_idx + span)
 
         if best_match:
             self.console.print(
@@ -208,30 +264,27 @@ class CodeMatcher:
         Returns:
             List of key patterns/identifiers
         """
-        key_patterns = []
-
-        for line in target_lines:
-            # Extract meaningful identifiers (alphanumeric sequences)
-            identifiers = re.findall(r'\w+', line)
-            key_patterns.extend(identifiers)
-
-            # Extract quoted strings
-            quoted_strings = re.findall(r'["\']([^"\']+)["\']', line)
-            key_patterns.extend(quoted_strings)
+        # A dict keeps first-seen order, so this dedups without the
+        # arbitrary ordering of list(set(...)).
+        seen = {}
 
-            # Extract version numbers or specific values
-            versions = re.findall(r'\d+\.\d+(?:\.\d+)?', line)
-            key_patterns.extend(versions)
+        def add(pattern: str) -> None:
+            if len(pattern) > 1 and pattern.lower() not in _GENERIC_WORDS:
+                seen[pattern] = None
 
-        # Remove common/generic words that aren't helpful for matching
-        generic_words = {
-            'the', 'and', 'or', 'if', 'then', 'else', 'for', 'while', 'do', 'return',
-            'public', 'private', 'static', 'final', 'class', 'import', 'package'
-        }
+        for line in target_lines:
+            for match in _KEY_PATTERN_RE.finditer(line):
+                quoted = match.group(1)
+                if quoted is not None:
+                    add(quoted)
+                    for sub in _KEY_SUBTOKEN_RE.finditer(quoted):
+                        add(sub.group())
+                else:
+                    add(match.group(2))
+            for match in _VERSION_RE.finditer(line):
+                add(match.group())
 
-        filtered_patterns = [
-            p for p in key_patterns if p.lower() not in generic_words and len(p) > 1]
-        return list(set(filtered_patterns))
+        return list(seen)
 
     def debug_match_attempt(self, file_lines: List[str], target_content: str
                             ) -> None:
@@ -319,16 +372,21 @@ class CodeMatcher:
         base_indent_len = len(base_indent)
 
         for line in new_lines:
-            if line.strip():  # Non-empty line
-                line_indent = len(line) - len(line.lstrip())
+            # One lstrip per line: its truthiness is the non-empty test,
+            # its length difference the indent width, replacing the
+            # separate strip/lstrip/startswith rescans.
+            stripped = line.lstrip()
+            if stripped:  # Non-empty line
+                line_indent = len(line) - len(stripped)
 
                 # Check if line already has correct base indentation
-                if line_indent >= base_indent_len and line.startswith(base_indent):
+                if (line_indent >= base_indent_len
+                        and line[:base_indent_len] == base_indent):
                     preserved_line = line
                 elif line_indent > 0:
                     preserved_line = base_indent + line
                 else:
-                    preserved_line = base_indent + line.strip()
+                    preserved_line = base_indent + stripped.rstrip()
             else:
                 preserved_line = line
 
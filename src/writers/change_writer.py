@@ -1,3 +1,7 @@
+import os
+from collections import defaultdict
+from operator import attrgetter
+from pathlib import Path
 from typing import List
 from rich.console import Console
 from rich.prompt import Confirm
@@ -5,6 +9,9 @@ from rich.prompt import Confirm
 from src.models.response import StructuredResponse
 from src.utils.code_matcher import CodeMatcher
 
+# C-level attribute chain lookup for the per-file change sort.
+_START_LINE_KEY = attrgetter('location.start_line')
+
 
 class ChangeWriter:
     """Writes upgrade changes to files based on StructuredResponse objects."""
@@ -21,11 +28,18 @@ class ChangeWriter:
             self.console.print("No changes suggested", style="yellow")
             return
 
+        # Group by file first: several responses can target the same
+        # file (one per extracted block), and handing them over together
+        # lets the per-file pass read, sort and write that file once.
+        responses_by_file = defaultdict(list)
         for response in responses:
             if response.changes:
                 file_path = response.changes[0].location.file_path
-                self._process_file_responses(
-                    file_path, [response], dry_run, auto_approve)
+                responses_by_file[file_path].append(response)
+
+        for file_path, file_responses in responses_by_file.items():
+            self._process_file_responses(
+                file_path, file_responses, dry_run, auto_approve)
 
     def _process_file_responses(self, file_path: str,
                                 responses: List[StructuredResponse],
@@ -37,8 +51,7 @@ class ChangeWriter:
         for response in responses:
             all_changes.extend(response.changes)
 
-        all_changes = sorted(all_changes,
-                             key=lambda c: c.location.start_line, reverse=True)
+        all_changes.sort(key=_START_LINE_KEY, reverse=True)
 
         if not all_changes:
             self.console.print(
@@ -83,13 +96,32 @@ class ChangeWriter:
                 self.console.print("⏭️ Skipped", style="yellow")
 
     def _apply_all_changes_batch(self, file_path: str, changes: List, auto_approve):
-        """Apply all changes in batch mode (auto-approve)."""
+        """Apply all changes in batch mode (auto-approve).
+
+        The file is read once, every change mutates the in-memory lines
+        (changes arrive sorted by descending line, so earlier splices
+        don't shift later indices), and the result is written back in
+        one pass instead of a full read-modify-write per change.
+        """
+        try:
+            content = Path(file_path).read_bytes().decode("utf-8")
+        except Exception as e:
+            self.console.print(f"❌ Error reading file: {e}", style="red")
+            return
+
+        lines = content.splitlines(keepends=True)
+
         applied_count = 0
         for change in changes:
-            success = self._apply_single_change(
-                file_path, change, auto_approve)
-            if success:
-                applied_count += 1
+            try:
+                if self._apply_change_in_memory(lines, change, auto_approve):
+                    applied_count += 1
+            except Exception as e:
+                self.console.print(
+                    f"❌ Error applying change: {e}", style="red")
+
+        if applied_count and not self._write_file(file_path, lines):
+            return
 
         self.console.print(f"✅ Applied {applied_count} changes", style="green")
 
@@ -99,28 +131,38 @@ class ChangeWriter:
         Try line number approach first, then fallback to content matching.
         """
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
+            # One read syscall and an explicit decode: skips text-mode
+            # buffering, universal-newline translation, and the locale
+            # default encoding (which differs on Windows).
+            content = Path(file_path).read_bytes().decode("utf-8")
 
             lines = content.splitlines(keepends=True)
 
-            if change.change_type == "insert":
-                return self._apply_insert_by_line_number(file_path, lines, change)
-
-            # For updates and deletes, try line number first, then content matching
-            if change.change_type in ["update", "delete"]:
-                if self._try_line_number_approach(file_path, lines, change):
-                    return True
-
-                return self._apply_by_content_matching(file_path, lines, change, auto_approve)
+            if not self._apply_change_in_memory(lines, change, auto_approve):
+                return False
 
-            return False
+            return self._write_file(file_path, lines)
 
         except Exception as e:
             self.console.print(f"❌ Error applying change: {e}", style="red")
             return False
 
-    def _apply_insert_by_line_number(self, file_path: str, lines: List[str], change) -> bool:
+    def _apply_change_in_memory(self, lines: List[str], change,
+                                auto_approve: bool) -> bool:
+        """Apply one change to the in-memory lines; no file I/O."""
+        if change.change_type == "insert":
+            return self._apply_insert_by_line_number(lines, change)
+
+        # For updates and deletes, try line number first, then content matching
+        if change.change_type in ["update", "delete"]:
+            if self._try_line_number_approach(lines, change):
+                return True
+
+            return self._apply_by_content_matching(lines, change, auto_approve)
+
+        return False
+
+    def _apply_insert_by_line_number(self, lines: List[str], change) -> bool:
         """Apply insert change using line number."""
         if not self._validate_change_bounds(change, len(lines)):
             self.console.print(
@@ -128,9 +170,6 @@ class ChangeWriter:
             return False
 
         start_idx = change.location.start_line - 1
-        after_content = change.after
-        if not after_content.endswith('\n'):
-            after_content += '\n'
 
         base_indentation = self._detect_insert_indentation(lines, start_idx)
         new_lines = self.code_matcher.preserve_indentation(
@@ -138,33 +177,34 @@ class ChangeWriter:
 
         lines[start_idx:start_idx] = new_lines
 
-        return self._write_file(file_path, lines)
+        return True
 
     def _detect_insert_indentation(self, lines: List[str], insert_idx: int) -> str:
+        # One pass over the 5 nearby lines collects the indent counts
+        # and, per width, the first line's actual whitespace prefix, so
+        # the old second walk to find an exemplar line is gone.
         indent_counts = {}
+        indent_prefixes = {}
 
         for offset in range(-2, 3):  # Check 5 nearby lines
             line_idx = insert_idx + offset
             if 0 <= line_idx < len(lines):
                 line = lines[line_idx].rstrip('\n\r')
-                if line.strip():
-                    indent = len(line) - len(line.lstrip())
+                stripped = line.lstrip()
+                if stripped:
+                    indent = len(line) - len(stripped)
                     indent_counts[indent] = indent_counts.get(indent, 0) + 1
+                    indent_prefixes.setdefault(indent, line[:indent])
 
         # Use most common indentation
         if indent_counts:
             most_common_indent = max(
                 indent_counts.items(), key=lambda x: x[1])[0]
-            for offset in range(-2, 3):
-                line_idx = insert_idx + offset
-                if 0 <= line_idx < len(lines):
-                    line = lines[line_idx].rstrip('\n\r')
-                    if line.strip() and len(line) - len(line.lstrip()) == most_common_indent:
-                        return line[:most_common_indent]
+            return indent_prefixes[most_common_indent]
 
         return ""
 
-    def _try_line_number_approach(self, file_path: str, lines: List[str], change) -> bool:
+    def _try_line_number_approach(self, lines: List[str], change) -> bool:
         """Try to apply change using LLM-suggested line numbers."""
         if not self._validate_change_bounds(change, len(lines)):
             return False
@@ -172,9 +212,20 @@ class ChangeWriter:
         start_idx = change.location.start_line - 1
         end_idx = change.location.end_line
 
+        expected_content = change.before.rstrip('\n')
+
+        # Cheap reject before materializing the joined slice: equal
+        # content implies equal first lines, and the LLM's line numbers
+        # are wrong often enough that this settles most attempts for
+        # the price of one single-line compare.
+        newline_pos = expected_content.find('\n')
+        expected_first = (expected_content if newline_pos < 0
+                          else expected_content[:newline_pos])
+        if lines[start_idx].rstrip('\n') != expected_first:
+            return False
+
         # Verify content matches at suggested location
         actual_content = ''.join(lines[start_idx:end_idx]).rstrip('\n')
-        expected_content = change.before.rstrip('\n')
 
         if actual_content == expected_content:
             # Exact match - apply the change
@@ -187,11 +238,11 @@ class ChangeWriter:
             elif change.change_type == "delete":
                 del lines[start_idx:end_idx]
 
-            return self._write_file(file_path, lines)
+            return True
 
         return False
 
-    def _apply_by_content_matching(self, file_path: str, lines: List[str], change, auto_approve: bool) -> bool:
+    def _apply_by_content_matching(self, lines: List[str], change, auto_approve: bool) -> bool:
         """Apply change using content pattern matching."""
         match_result = self.code_matcher.find_content_match(
             lines, change.before)
@@ -223,24 +274,35 @@ class ChangeWriter:
             f"✅ Applied using content matching (lines {start_idx+1}-{end_idx})",
             style="green")
 
-        return self._write_file(file_path, lines)
+        return True
 
     def _write_file(self, file_path: str, lines: List[str]) -> bool:
-        """Write lines back to file."""
+        """Write lines back to file atomically.
+
+        One join and one encode produce the whole buffer, written with a
+        single binary write instead of streaming the list through the
+        text-I/O stack line by line (which also kept the lines' own
+        endings verbatim; bytes do that by construction). The temp-file
+        + os.replace rename means an interrupt mid-write can never leave
+        a half-written source file behind.
+        """
+        tmp_path = file_path + ".tmp"
         try:
-            with open(file_path, 'w') as f:
-                f.writelines(lines)
+            data = "".join(lines).encode("utf-8")
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, file_path)
             return True
         except Exception as e:
             self.console.print(f"❌ Error writing file: {e}", style="red")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
             return False
 
     def _validate_change_bounds(self, change, total_lines):
         """Validate that change line numbers are within file bounds."""
-        if change.location.start_line < 1 or change.location.start_line > total_lines:
-            return False
-        if change.location.end_line < 1 or change.location.end_line > total_lines:
-            return False
-        if change.location.start_line > change.location.end_line:
-            return False
-        return True
+        start_line = change.location.start_line
+        end_line = change.location.end_line
+        return (1 <= start_line <= end_line <= total_lines)